@@ -5,10 +5,17 @@
 """
 
 import re
-import json
-import base64
-import requests
-from datetime import datetime
+import asyncio
+
+# 标签HTML剥离正则，模块加载时编译一次
+_TAG_RE = re.compile(r'<[^>]+?>')
+# 模板占位符 {{变量}}
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+
+# 词云交替配色
+_WORD_COLORS = ('var(--primary)', 'var(--gold)')
+_CHALLENGE_COLORS = ('var(--primary)', '#A03030')
+_OPPORTUNITY_COLORS = ('var(--green)', '#3D7A6A')
 
 class WCFXReportGenerator:
     """文创分析师报告生成器"""
@@ -16,6 +23,29 @@ class WCFXReportGenerator:
     def __init__(self, template_path='wcfx-template.html'):
         with open(template_path, 'r', encoding='utf-8') as f:
             self.template = f.read()
+        
+        # 预解析模板: [(文字片段, 变量名), ..., (末尾片段, None)]
+        self._segments = []
+        last = 0
+        for m in _PLACEHOLDER_RE.finditer(self.template):
+            self._segments.append((self.template[last:m.start()], m.group(1)))
+            last = m.end()
+        self._segments.append((self.template[last:], None))
+    
+    def _render(self, data):
+        """按预解析片段拼接 {{变量}}，未提供的变量原样保留"""
+        parts = []
+        for literal, key in self._segments:
+            parts.append(literal)
+            if key is not None:
+                parts.append(str(data[key]) if key in data else f'{{{{{key}}}}}')
+        return ''.join(parts)
+    
+    def _save(self, html, output_path):
+        """保存文件"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f'✅ 报告已生成: {output_path}')
     
     def generate(self, data, output_path=None):
         """
@@ -28,18 +58,32 @@ class WCFXReportGenerator:
         Returns:
             生成的HTML字符串
         """
-        html = self.template
+        html = self._render(data)
         
-        # 替换所有 {{变量}}
-        for key, value in data.items():
-            placeholder = f'{{{{{key}}}}}'
-            html = html.replace(placeholder, str(value))
+        if output_path:
+            self._save(html, output_path)
+        
+        return html
+    
+    async def generate_async(self, data, output_path=None):
+        """
+        异步生成报告，文件写入交由线程池执行，不阻塞事件循环
+        
+        批量生成:
+            await asyncio.gather(*[generator.generate_async(d, p) for d, p in jobs])
+        
+        Args:
+            data: 产品数据字典
+            output_path: 输出文件路径
+        
+        Returns:
+            生成的HTML字符串
+        """
+        html = self._render(data)
         
-        # 保存文件
         if output_path:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(html)
-            print(f'✅ 报告已生成: {output_path}')
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._save, html, output_path)
         
         return html
     
@@ -59,7 +103,7 @@ class WCFXReportGenerator:
         # 检查标签字数
         if 'USER_TAGS' in data:
             # 提取标签文字
-            tags_text = re.sub(r'<[^>]+?>', '', data['USER_TAGS'])
+            tags_text = ''.join(_TAG_RE.split(data['USER_TAGS']))
             if len(tags_text) > 18:
                 print(f'⚠️ 警告: 标签总字数 {len(tags_text)} 超过18字限制')
         
@@ -128,8 +172,8 @@ def create_word_cloud(words):
         HTML字符串
     """
     word_spans = []
-    for text, size, left, top, delay in words:
-        color = 'var(--primary)' if len(word_spans) % 2 == 0 else 'var(--gold)'
+    for i, (text, size, left, top, delay) in enumerate(words):
+        color = _WORD_COLORS[i & 1]
         word_spans.append(f'<span class="word" style="font-size: {size}px; color: {color}; left: {left}%; top: {top}%; animation-delay: {delay}s;">{text}</span>')
     return '\n'.join(word_spans)
 
@@ -145,12 +189,10 @@ def create_co_words(items, is_challenge=True):
     Returns:
         HTML字符串
     """
+    colors = _CHALLENGE_COLORS if is_challenge else _OPPORTUNITY_COLORS
     words = []
-    for text, size, left, top, delay in items:
-        if is_challenge:
-            color = 'var(--primary)' if len(words) % 2 == 0 else '#A03030'
-        else:
-            color = 'var(--green)' if len(words) % 2 == 0 else '#3D7A6A'
+    for i, (text, size, left, top, delay) in enumerate(items):
+        color = colors[i & 1]
         words.append(f'<span class="co-word" style="font-size: {size}px; color: {color}; left: {left}%; top: {top}%; animation-delay: {delay}s;">{text}</span>')
     return '\n'.join(words)
 
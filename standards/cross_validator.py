@@ -3,9 +3,146 @@
 交叉验证工具
 验证数据是否有多个独立来源支持
 """
-import requests
-import json
-from urllib.parse import urlparse
+import re
+from functools import lru_cache
+
+# 品牌模板化名称特征
+_BRAND_FORBIDDEN_PATTERNS = ('文创品牌', '文旅综合体', '非遗活化')
+
+# 政策模板化标题特征
+_POLICY_TEMPLATE_PATTERNS = ('关于促进', '关于加快', '关于推动', '关于支持')
+
+# 来源可信度评级
+_CREDIBILITY_LEVELS = {
+    'A': (
+        'tmall.com', 'jd.com',  # 电商官方
+        'gov.cn',  # 政府网站
+    ),
+    'B': (
+        '36kr.com', 'huxiu.com',  # 科技媒体
+        'sina.com.cn', 'qq.com',  # 门户
+    ),
+    'C': (
+        'xiaohongshu.com', 'douyin.com',  # 社交
+        'zhihu.com',  # 问答
+    )
+}
+
+# 域名 -> 可信度，高等级优先
+_CREDIBILITY_BY_DOMAIN = {}
+for _level, _domains in _CREDIBILITY_LEVELS.items():
+    for _domain in _domains:
+        _CREDIBILITY_BY_DOMAIN.setdefault(_domain, _level)
+del _level, _domains, _domain
+
+# 可信来源等级
+_GOOD_LEVELS = frozenset(('A', 'B'))
+
+# 政府网站域名后缀
+_GOV_SUFFIX = '.gov.cn'
+
+# URL网络位置: [scheme:]//netloc
+_NETLOC_RE = re.compile(r'(?:[A-Za-z][A-Za-z0-9+.-]*:)?//([^/?#]*)')
+# 与 urlparse 一致，解析前去除URL中的制表符与换行
+_URL_UNSAFE = str.maketrans('', '', '\t\r\n')
+
+
+def _netloc(url):
+    """
+    提取URL的网络位置，只解析 [scheme:]//netloc 前缀
+    
+    常见URL下与 urlparse(url).netloc 结果相同；不校验IPv6方括号是否闭合
+    """
+    m = _NETLOC_RE.match(url.lstrip().translate(_URL_UNSAFE))
+    return m.group(1) if m else ''
+
+
+def _hostname(netloc):
+    """去掉网络位置中的用户信息与端口，返回小写主机名"""
+    host = netloc.rpartition('@')[2].lower()
+    if host.startswith('['):
+        return host[:host.find(']') + 1]
+    return host.partition(':')[0].rstrip('.')
+
+
+def _domain_independence(domains):
+    """按已解析的域名列表检查来源是否独立"""
+    # 检查是否有重复域名
+    unique_domains = set(domains)
+    
+    return {
+        'is_independent': len(unique_domains) >= 2,
+        'unique_domains': list(unique_domains),
+        'total_sources': len(domains)
+    }
+
+
+def _source_independence(urls):
+    """检查来源是否独立"""
+    return _domain_independence([_netloc(url) for url in urls])
+
+
+def _host_credibility(domain):
+    """按主机名检查来源可信度"""
+    # 按域名后缀逐级查表: a.b.gov.cn -> b.gov.cn -> gov.cn -> cn
+    labels = domain.split('.')
+    for i in range(len(labels)):
+        level = _CREDIBILITY_BY_DOMAIN.get('.'.join(labels[i:]))
+        if level:
+            return level
+    
+    return 'D'  # 未知来源
+
+
+def _source_credibility(url):
+    """检查来源可信度"""
+    return _host_credibility(_hostname(_netloc(url)))
+
+
+@lru_cache(maxsize=4096)
+def _validate_brand(brand_name, urls, forbidden_patterns):
+    """品牌交叉验证（纯函数，按品牌名+来源URL+模板特征缓存）"""
+    result = {
+        'brand': brand_name,
+        'is_valid': False,
+        'checks': {}
+    }
+    
+    # 1. 检查来源数量
+    result['checks']['source_count'] = len(urls) >= 2
+    
+    # 每个URL只解析一次，独立性与可信度共用
+    netlocs = [_netloc(url) for url in urls]
+    
+    # 2. 检查来源独立性
+    independence = _domain_independence(netlocs)
+    result['checks']['independence'] = independence['is_independent']
+    result['domain_analysis'] = independence
+    
+    # 3. 检查来源可信度
+    credibility_scores = [_host_credibility(_hostname(netloc)) for netloc in netlocs]
+    
+    result['checks']['has_credible_source'] = any(s in _GOOD_LEVELS for s in credibility_scores)
+    result['credibility_scores'] = credibility_scores
+    
+    # 4. 检查是否为模板
+    result['checks']['not_template'] = not any(p in brand_name for p in forbidden_patterns)
+    
+    # 综合判断
+    result['is_valid'] = all(result['checks'].values())
+    
+    return result
+
+
+def _copy_brand_result(result):
+    """复制缓存结果，调用方修改返回值不会污染缓存"""
+    copied = dict(result)
+    copied['checks'] = dict(result['checks'])
+    copied['domain_analysis'] = dict(result['domain_analysis'])
+    copied['domain_analysis']['unique_domains'] = list(result['domain_analysis']['unique_domains'])
+    copied['credibility_scores'] = list(result['credibility_scores'])
+    return copied
+
 
 class CrossValidator:
     """交叉验证器"""
@@ -15,7 +152,7 @@ class CrossValidator:
             'brand': {
                 'min_sources': 2,
                 'required_source_types': ['official', 'media'],
-                'forbidden_patterns': ['文创品牌', '文旅综合体', '非遗活化']
+                'forbidden_patterns': list(_BRAND_FORBIDDEN_PATTERNS)
             },
             'product': {
                 'min_sources': 2,
@@ -31,80 +168,17 @@ class CrossValidator:
     
     def check_source_independence(self, sources):
         """检查来源是否独立"""
-        domains = []
-        for source in sources:
-            url = source.get('url', '')
-            domain = urlparse(url).netloc
-            domains.append(domain)
-        
-        # 检查是否有重复域名
-        unique_domains = set(domains)
-        
-        return {
-            'is_independent': len(unique_domains) >= 2,
-            'unique_domains': list(unique_domains),
-            'total_sources': len(sources)
-        }
+        return _source_independence([source.get('url', '') for source in sources])
     
     def check_source_credibility(self, url):
         """检查来源可信度"""
-        domain = urlparse(url).netloc.lower()
-        
-        # 可信度评级
-        credibility_levels = {
-            'A': [
-                'tmall.com', 'jd.com',  # 电商官方
-                'gov.cn',  # 政府网站
-            ],
-            'B': [
-                '36kr.com', 'huxiu.com',  # 科技媒体
-                'sina.com.cn', 'qq.com',  # 门户
-            ],
-            'C': [
-                'xiaohongshu.com', 'douyin.com',  # 社交
-                'zhihu.com',  # 问答
-            ]
-        }
-        
-        for level, domains in credibility_levels.items():
-            if any(d in domain for d in domains):
-                return level
-        
-        return 'D'  # 未知来源
+        return _source_credibility(url)
     
     def validate_brand_cross(self, brand_name, sources):
         """品牌交叉验证"""
-        result = {
-            'brand': brand_name,
-            'is_valid': False,
-            'checks': {}
-        }
-        
-        # 1. 检查来源数量
-        result['checks']['source_count'] = len(sources) >= 2
-        
-        # 2. 检查来源独立性
-        independence = self.check_source_independence(sources)
-        result['checks']['independence'] = independence['is_independent']
-        result['domain_analysis'] = independence
-        
-        # 3. 检查来源可信度
-        credibility_scores = []
-        for source in sources:
-            score = self.check_source_credibility(source.get('url', ''))
-            credibility_scores.append(score)
-        
-        result['checks']['has_credible_source'] = any(s in ['A', 'B'] for s in credibility_scores)
-        result['credibility_scores'] = credibility_scores
-        
-        # 4. 检查是否为模板
-        template_patterns = self.validation_rules['brand']['forbidden_patterns']
-        result['checks']['not_template'] = not any(p in brand_name for p in template_patterns)
-        
-        # 综合判断
-        result['is_valid'] = all(result['checks'].values())
-        
-        return result
+        urls = tuple(source.get('url', '') for source in sources)
+        forbidden_patterns = tuple(self.validation_rules['brand']['forbidden_patterns'])
+        return _copy_brand_result(_validate_brand(brand_name, urls, forbidden_patterns))
     
     def validate_policy_cross(self, policy_data):
         """政策交叉验证"""
@@ -124,15 +198,15 @@ class CrossValidator:
         
         # 3. 检查来源是否为政府网站
         if source_url:
-            is_gov = 'gov.cn' in source_url.lower()
+            host = _hostname(_netloc(source_url))
+            is_gov = ('.' + host).endswith(_GOV_SUFFIX)
             result['checks']['is_gov_source'] = is_gov
         else:
             result['checks']['is_gov_source'] = False
         
         # 4. 检查标题是否为模板
-        template_patterns = ['关于促进', '关于加快', '关于推动', '关于支持']
         title = policy_data.get('title', '')
-        result['checks']['not_template'] = not all(p in title for p in template_patterns[:2])
+        result['checks']['not_template'] = not all(p in title for p in _POLICY_TEMPLATE_PATTERNS[:2])
         
         # 综合判断
         # 政策至少需要有文号或政府来源
@@ -143,6 +217,13 @@ class CrossValidator:
 
 def generate_validation_report(items, data_type='brand'):
     """生成验证报告"""
+    # 品牌数据在入口处一次性拆为名称列与URL列，按列验证
+    if data_type == 'brand':
+        return generate_brand_report(
+            [item.get('name', '') for item in items],
+            [[source.get('url', '') for source in item.get('sources', [])] for item in items]
+        )
+    
     validator = CrossValidator()
     
     report = {
@@ -153,16 +234,11 @@ def generate_validation_report(items, data_type='brand'):
         'details': []
     }
     
+    if data_type != 'policy':
+        return report
+    
     for item in items:
-        if data_type == 'brand':
-            result = validator.validate_brand_cross(
-                item.get('name', ''),
-                item.get('sources', [])
-            )
-        elif data_type == 'policy':
-            result = validator.validate_policy_cross(item)
-        else:
-            continue
+        result = validator.validate_policy_cross(item)
         
         if result['is_valid']:
             report['passed'] += 1
@@ -174,6 +250,35 @@ def generate_validation_report(items, data_type='brand'):
     return report
 
 
+def generate_brand_report(names, source_urls):
+    """
+    按列生成品牌验证报告，适用于CSV/表格导出的数据
+    
+    Args:
+        names: 品牌名列表
+        source_urls: 与names等长，每项为该品牌的来源URL列表
+    
+    Returns:
+        与 generate_validation_report(items, 'brand') 相同结构的报告
+    """
+    if len(names) != len(source_urls):
+        raise ValueError(f"列长度不一致: names={len(names)}, source_urls={len(source_urls)}")
+    
+    details = [
+        _copy_brand_result(_validate_brand(name, tuple(urls), _BRAND_FORBIDDEN_PATTERNS))
+        for name, urls in zip(names, source_urls)
+    ]
+    passed = sum(1 for r in details if r['is_valid'])
+    
+    return {
+        'data_type': 'brand',
+        'total': len(details),
+        'passed': passed,
+        'failed': len(details) - passed,
+        'details': details
+    }
+
+
 # 使用示例
 if __name__ == '__main__':
     print("=" * 70)
@@ -3,17 +3,69 @@
 验证中间件 - 强制所有数据处理经过验证
 最高优先级：坚决与AI幻觉作斗争
 """
+import re
 import json
-import requests
+import queue
+import hashlib
+import time
+import atexit
+import threading
 from datetime import datetime
+from collections import OrderedDict
 from functools import wraps
 
+# 模板化名称特征
+_TEMPLATE_PATTERNS = (
+    '文创品牌', '文旅综合体', '非遗活化', '数字文创', '文创街区',
+    '{city}', '{region}', '某', '示例', '测试'
+)
+# 模糊表述
+_VAGUE_WORDS = ('可能', '大概', '也许', '估计', '应该', '据说')
+
+# 多模式快速预筛：未命中时跳过逐个模式比对
+_TEMPLATE_RE = re.compile('|'.join(map(re.escape, _TEMPLATE_PATTERNS)))
+_VAGUE_RE = re.compile('|'.join(map(re.escape, _VAGUE_WORDS)))
+
+
+# 时间戳复用窗口（秒）
+_ISO_TTL = 0.01
+_iso_cache = (0.0, '')
+
+
+def _iso_now():
+    """当前时间ISO字符串，窗口内复用同一格式化结果"""
+    global _iso_cache
+    t = time.time()
+    cached_t, cached_iso = _iso_cache
+    if not 0 <= t - cached_t <= _ISO_TTL:
+        cached_iso = datetime.fromtimestamp(t).isoformat()
+        _iso_cache = (t, cached_iso)
+    return cached_iso
+
+
+def _walk_strings(obj):
+    """遍历嵌套数据中的所有字符串（含字典键）"""
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            if isinstance(key, str):
+                yield key
+            yield from _walk_strings(value)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            yield from _walk_strings(item)
+
+
 class VerificationMiddleware:
     """验证中间件 - 所有数据必须经过验证"""
     
     def __init__(self):
         self.validation_log = []
         self.strict_mode = True  # 严格模式，不通过验证的数据将被拒绝
+        self.cache_size = 0  # 验证结果缓存条数，0为不缓存；重复回放场景可开启
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def validate_required(self, func):
         """装饰器：强制验证装饰器"""
@@ -22,35 +74,70 @@ class VerificationMiddleware:
             # 执行原函数
             result = func(*args, **kwargs)
             
+            # 非字典结果无需验证
+            if not isinstance(result, dict):
+                return result
+            
             # 强制验证
-            if isinstance(result, dict):
-                validation_result = self.verify_data(result)
-                
-                if not validation_result['passed']:
-                    if self.strict_mode:
-                        raise ValueError(
-                            f"数据验证失败: {validation_result['errors']}\n"
-                            f"数据: {json.dumps(result, ensure_ascii=False)[:200]}"
-                        )
-                    else:
-                        # 标记为待验证
-                        result['_verification'] = {
-                            'status': 'PENDING',
-                            'errors': validation_result['errors'],
-                            'timestamp': datetime.now().isoformat()
-                        }
-                else:
-                    # 标记为已验证
-                    result['_verification'] = {
-                        'status': 'VERIFIED',
-                        'level': validation_result['level'],
-                        'timestamp': datetime.now().isoformat()
-                    }
+            validation_result = self.verify_data(result)
+            
+            if not validation_result['passed']:
+                if self.strict_mode:
+                    # 严格模式直接拒绝，错误信息仅在失败时构建
+                    raise ValueError(
+                        f"数据验证失败: {validation_result['errors']}\n"
+                        f"数据: {json.dumps(result, ensure_ascii=False)[:200]}"
+                    )
+                # 标记为待验证
+                result['_verification'] = {
+                    'status': 'PENDING',
+                    'errors': validation_result['errors'],
+                    'timestamp': _iso_now()
+                }
+            else:
+                # 标记为已验证
+                result['_verification'] = {
+                    'status': 'VERIFIED',
+                    'level': validation_result['level'],
+                    'timestamp': _iso_now()
+                }
             
             return result
         return wrapper
     
     def verify_data(self, data):
+        """验证数据（相同内容的记录直接返回缓存结果）"""
+        if not self.cache_size:
+            return self._verify_data(data)
+        
+        try:
+            canonical = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # 无法序列化的数据不缓存
+            return self._verify_data(data)
+        key = hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+        
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+        
+        if result is None:
+            result = self._verify_data(data)
+            with self._cache_lock:
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        
+        # 返回副本，调用方修改不会污染缓存
+        return {
+            'passed': result['passed'],
+            'level': result['level'],
+            'errors': list(result['errors']),
+            'warnings': list(result['warnings'])
+        }
+    
+    def _verify_data(self, data):
         """验证数据"""
         errors = []
         warnings = []
@@ -93,30 +180,27 @@ class VerificationMiddleware:
         
         # 检查模板化名称
         name = data.get('name', data.get('title', ''))
-        template_patterns = [
-            '文创品牌', '文旅综合体', '非遗活化', '数字文创', '文创街区',
-            '{city}', '{region}', '某', '示例', '测试'
-        ]
-        
-        for pattern in template_patterns:
-            if pattern in name:
-                errors.append(f"疑似AI生成/模板数据: 包含'{pattern}'")
+        if _TEMPLATE_RE.search(name):
+            for pattern in _TEMPLATE_PATTERNS:
+                if pattern in name:
+                    errors.append(f"疑似AI生成/模板数据: 包含'{pattern}'")
         
         # 检查模糊表述
-        vague_words = ['可能', '大概', '也许', '估计', '应该', '据说']
-        data_str = json.dumps(data, ensure_ascii=False)
-        for word in vague_words:
-            if word in data_str:
-                warnings.append(f"包含模糊表述: '{word}'")
+        # 直接拼接字符串叶子与键，免去整条记录的JSON序列化
+        data_str = '\x00'.join(_walk_strings(data))
+        if _VAGUE_RE.search(data_str):
+            for word in _VAGUE_WORDS:
+                if word in data_str:
+                    warnings.append(f"包含模糊表述: '{word}'")
         
         # 检查是否缺少具体数据
         if 'kpi' in data:
             kpi = data['kpi']
-            if isinstance(kpi, dict):
+            # 来源标注与具体KPI项无关，只需判断一次
+            if isinstance(kpi, dict) and '来源' not in data_str and 'source' not in data_str:
                 for key, value in kpi.items():
                     if isinstance(value, str) and ('万' in value or '亿' in value):
-                        if '来源' not in data_str and 'source' not in data_str:
-                            warnings.append(f"KPI数据'{key}'缺少来源标注")
+                        warnings.append(f"KPI数据'{key}'缺少来源标注")
         
         return {'errors': errors, 'warnings': warnings}
     
@@ -177,29 +261,110 @@ def require_verification(func):
 class VerificationReporter:
     """验证报告生成器"""
     
-    def __init__(self):
+    def __init__(self, keep_details=True, log_path=None):
         self.reports = []
+        self.keep_details = keep_details  # False时仅计数，不保留明细
+        self._passed = 0
+        self._failed = 0
+        
+        # 指定log_path时，报告以JSON Lines格式由后台线程批量写入
+        # 文件在此处打开，路径无效时直接向调用方抛出异常
+        self.log_path = log_path
+        self._file = None
+        self._queue = None
+        self._writer = None
+        self._closed = False
+        self._lock = threading.Lock()  # 保护计数、明细与入队；关闭标记之后不再有记录入队
+        if log_path:
+            self._file = open(log_path, 'ab')
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
     
     def add_report(self, data, result):
-        """添加验证报告"""
-        self.reports.append({
-            'timestamp': datetime.now().isoformat(),
-            'data_summary': str(data)[:100],
-            'result': result
-        })
+        """
+        添加验证报告
+        
+        指定了log_path的报告在 close() 之后不能再添加，否则抛出 ValueError
+        """
+        if self._closed:
+            raise ValueError("验证报告日志已关闭")
+        
+        record = None
+        line = None
+        if self.keep_details or self.log_path:
+            record = {
+                'timestamp': _iso_now(),
+                'data_summary': str(data)[:100],
+                'result': result
+            }
+        if self.log_path:
+            # 在调用方线程序列化：序列化错误直接抛出，之后修改result也不影响日志
+            line = (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        
+        # 计数、明细与日志在同一把锁内更新，并发调用时三者保持一致
+        with self._lock:
+            if self._closed:
+                raise ValueError("验证报告日志已关闭")
+            if result['passed']:
+                self._passed += 1
+            else:
+                self._failed += 1
+            if self.keep_details:
+                self.reports.append(record)
+            if line is not None:
+                self._queue.put(line)
+    
+    def _write_loop(self):
+        """后台写入线程：取出队列中积压的全部记录，一次写入"""
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = None in batch
+            lines = [line for line in batch if line is not None]
+            try:
+                self._file.write(b''.join(lines))
+                self._file.flush()
+            except OSError as e:
+                # 单批写入失败不终止线程，后续批次继续写入
+                print(f'⚠️ 验证日志写入失败，丢弃 {len(lines)} 条记录: {e}')
+            if stop:
+                return
+    
+    def close(self):
+        """写完队列中剩余记录并停止后台线程"""
+        with self._lock:
+            if self._writer is None or self._closed:
+                return
+            # 先标记关闭再放入结束标记，之后的 add_report 不会再入队
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+        atexit.unregister(self.close)
+        self._writer = None
+        self._queue = None
+        self._file = None
     
     def generate_summary(self):
         """生成汇总报告"""
-        total = len(self.reports)
-        passed = sum(1 for r in self.reports if r['result']['passed'])
-        failed = total - passed
+        with self._lock:
+            passed = self._passed
+            failed = self._failed
+        total = passed + failed
         
         return {
             'total': total,
             'passed': passed,
             'failed': failed,
             'pass_rate': f"{passed/total*100:.1f}%" if total > 0 else "0%",
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _iso_now()
         }
 
 